@@ -1,66 +1,242 @@
 import streamlit as st
-import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+import html
 import os
+import shutil
+from contextlib import contextmanager
 from datetime import datetime
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
 # =============================================
 # FILE CONFIGURATION
 # =============================================
 DATA_DIR = "data"
-USERS_FILE = os.path.join(DATA_DIR, "users.csv")
-COURSES_FILE = os.path.join(DATA_DIR, "courses.csv")
-ASSIGNMENTS_FILE = os.path.join(DATA_DIR, "assignments.csv")
-SUBMISSIONS_FILE = os.path.join(DATA_DIR, "submissions.csv")
+IMAGES_DIR = "uploads/course_images"
+USERS_FILE = os.path.join(DATA_DIR, "users.parquet")
+COURSES_FILE = os.path.join(DATA_DIR, "courses.parquet")
+ASSIGNMENTS_FILE = os.path.join(DATA_DIR, "assignments.parquet")
+SUBMISSIONS_FILE = os.path.join(DATA_DIR, "submissions.parquet")
+
+# Sidecar files holding the next free ID for each table
+USERS_COUNTER = os.path.join(DATA_DIR, ".next_user_id")
+COURSES_COUNTER = os.path.join(DATA_DIR, ".next_course_id")
 
 REQUIRED_STRUCTURE = {
-    USERS_FILE: ['user_id', 'username', 'password', 'role', 'created_at'],
-    COURSES_FILE: [
-        'course_id', 'course_name', 'description', 'instructor', 
-        'schedule', 'created_at', 'enrollment_status', 
-        'image_path', 'youtube_link'  # Add these 2 new columns
-    ],
-    ASSIGNMENTS_FILE: ['assignment_id', 'course_id', 'title', 'description',
-                      'due_date', 'max_points', 'created_at'],
-    SUBMISSIONS_FILE: ['submission_id', 'assignment_id', 'student_username',
-                      'submission_date', 'status', 'grade', 'feedback']
+    USERS_FILE: pa.schema([
+        ('user_id', pa.int64()), ('username', pa.string()),
+        ('password', pa.string()), ('role', pa.string()),
+        ('created_at', pa.timestamp('ms'))
+    ]),
+    COURSES_FILE: pa.schema([
+        ('course_id', pa.int64()), ('course_name', pa.string()),
+        ('description', pa.string()), ('instructor', pa.string()),
+        ('schedule', pa.string()), ('created_at', pa.timestamp('ms')),
+        ('enrollment_status', pa.string()),
+        ('image_path', pa.string()), ('youtube_link', pa.string())
+    ]),
+    ASSIGNMENTS_FILE: pa.schema([
+        ('assignment_id', pa.int64()), ('course_id', pa.int64()),
+        ('title', pa.string()), ('description', pa.string()),
+        ('due_date', pa.string()), ('max_points', pa.string()),
+        ('created_at', pa.timestamp('ms'))
+    ]),
+    SUBMISSIONS_FILE: pa.schema([
+        ('submission_id', pa.int64()), ('assignment_id', pa.int64()),
+        ('student_username', pa.string()), ('submission_date', pa.string()),
+        ('status', pa.string()), ('grade', pa.string()),
+        ('feedback', pa.string())
+    ])
 }
 
+# =============================================
+# DATA ACCESS
+# =============================================
+def conform(df, schema):
+    """Reorder and coerce DataFrame columns to match a table schema"""
+    import pandas as pd
+
+    df = df.reindex(columns=schema.names)
+    for field in schema:
+        col = df[field.name]
+        if pa.types.is_integer(field.type):
+            df[field.name] = pd.to_numeric(col, errors='coerce').astype('Int64')
+        elif pa.types.is_timestamp(field.type):
+            df[field.name] = pd.to_datetime(col, errors='coerce').dt.floor('ms')
+        else:
+            df[field.name] = col.where(col.isna(), col.astype(str))
+    return df
+
+def write_arrow(path, table):
+    """Replace a Parquet file atomically with an Arrow table"""
+    tmp_path = f"{path}.tmp"
+    pq.write_table(table, tmp_path, compression="snappy")
+    os.replace(tmp_path, path)
+
+def write_table(path, df):
+    """Write a DataFrame to its Parquet file using the declared schema"""
+    table = pa.Table.from_pandas(conform(df, REQUIRED_STRUCTURE[path]),
+                                 schema=REQUIRED_STRUCTURE[path],
+                                 preserve_index=False)
+    write_arrow(path, table)
+
+def record_table(path, values):
+    """Build a one-row Arrow table from values given in schema column order"""
+    schema = REQUIRED_STRUCTURE[path]
+    return pa.Table.from_arrays(
+        [pa.array([value], type=field.type) for value, field in zip(values, schema)],
+        schema=schema
+    )
+
+@contextmanager
+def file_lock(path):
+    """Hold an exclusive lock on path (created if needed) for the block"""
+    with open(path, "a+") as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield f
+        finally:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+def append_row(path, values):
+    """Append one record, given in schema column order.
+
+    Parquet files cannot be extended in place, so the existing rows and the
+    new one are rewritten as a single row group into a temporary file, then
+    swapped in. Keeping one row group stops the file fragmenting and keeps
+    filtered reads fast. The whole rewrite runs under a lock so concurrent
+    sessions can't lose each other's rows.
+    """
+    new_rows = record_table(path, values)
+    with file_lock(f"{path}.lock"):
+        with open(path, "rb") as src:
+            existing = pq.ParquetFile(src).read()
+        write_arrow(path, pa.concat_tables([existing, new_rows]).combine_chunks())
+
+def next_id(counter_path, table_path, id_column):
+    """Allocate the next ID from a counter file, seeding it from the table once"""
+    with file_lock(counter_path) as f:
+        f.seek(0)
+        current = f.read().strip()
+        if current:
+            new_id = int(current)
+        else:
+            ids = pq.ParquetFile(table_path, memory_map=True).read(columns=[id_column])[id_column]
+            new_id = (pc.max(ids).as_py() or 0) + 1
+        f.seek(0)
+        f.truncate()
+        f.write(str(new_id + 1))
+        f.flush()
+    return new_id
+
+# Files only change through the writers above, so reads are cached across
+# reruns. Call .clear() on the matching loader after every write.
+# pandas is imported lazily so the login page never has to load it; users
+# are read through pq.ParquetFile because pq.read_table pulls in
+# pyarrow.dataset, which imports pandas.
+@st.cache_data(ttl=300)
+def load_users(columns=None):
+    return pq.ParquetFile(USERS_FILE, memory_map=True).read(columns=columns)
+
+@st.cache_data(ttl=300)
+def load_courses(columns=None, filters=None):
+    import pandas as pd
+
+    return pd.read_parquet(COURSES_FILE, engine="pyarrow",
+                           columns=columns, filters=filters)
+
+@st.cache_data(ttl=30)
+def existing_images():
+    """Paths of all uploaded course images, from a single directory scan"""
+    if not os.path.isdir(IMAGES_DIR):
+        return set()
+    with os.scandir(IMAGES_DIR) as entries:
+        return {f"{IMAGES_DIR}/{entry.name}" for entry in entries}
+
 # =============================================
 # SYSTEM INITIALIZATION
 # =============================================
+@st.cache_resource
+def ensure_dirs():
+    """Create the data and upload directories once per server process"""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    os.makedirs(IMAGES_DIR, exist_ok=True)
+    return True
+
+def schema_drift(path, schema):
+    """Columns missing from, or stored with another type in, a Parquet file"""
+    existing = pq.read_schema(path)
+    missing_cols = [col for col in schema.names if col not in existing.names]
+    retyped_cols = [field.name for field in schema
+                    if field.name in existing.names and
+                    existing.field(field.name).type != field.type]
+    return missing_cols, retyped_cols
+
 def initialize_system():
     """Create data directory and files with proper structure"""
     try:
-        os.makedirs(DATA_DIR, exist_ok=True)
+        ensure_dirs()
+        rewritten = False
         
-        for file_path, columns in REQUIRED_STRUCTURE.items():
-            if not os.path.exists(file_path):
-                pd.DataFrame(columns=columns).to_csv(file_path, index=False)
-            else:
+        for file_path, schema in REQUIRED_STRUCTURE.items():
+            # Steady state: only the file footer is read, no lock taken
+            if os.path.exists(file_path) and not any(schema_drift(file_path, schema)):
+                continue
+
+            rewritten = True
+            with file_lock(f"{file_path}.lock"):
+                # Re-check under the lock; another session may have got here first
+                if not os.path.exists(file_path):
+                    # Import data from the legacy CSV store if present
+                    legacy_csv = os.path.splitext(file_path)[0] + ".csv"
+                    if os.path.exists(legacy_csv):
+                        import pandas as pd
+                        write_table(file_path, pd.read_csv(legacy_csv, dtype=str))
+                    elif file_path == USERS_FILE:
+                        # A fresh users file starts with the default admin
+                        write_arrow(file_path, record_table(file_path, [
+                            1, 'admin', 'admin123', 'admin', datetime.now()
+                        ]))
+                    else:
+                        write_arrow(file_path, schema.empty_table())
+                    continue
+
                 # ========== MODIFIED SECTION ==========
-                df = pd.read_csv(file_path)
-                # Check for missing columns
-                missing_cols = [col for col in columns if col not in df.columns]
-                
-                if missing_cols:
+                missing_cols, retyped_cols = schema_drift(file_path, schema)
+                if missing_cols or retyped_cols:
                     # Add missing columns with null values
+                    df = pq.ParquetFile(file_path).read().to_pandas()
                     for col in missing_cols:
                         df[col] = None
-                    # Save updated version
-                    df.to_csv(file_path, index=False)    
+                    # Save updated version (write_table coerces column types)
+                    write_table(file_path, df)
 
+        if rewritten:
+            # Cached reads may predate the import or migration
+            st.cache_data.clear()
 
         # Create default admin if none exists
-        users = pd.read_csv(USERS_FILE)
-        if users.empty or not users[users['role'] == 'admin'].any().any():
-            new_admin = pd.DataFrame([{
-                'user_id': 1,
-                'username': 'admin',
-                'password': 'admin123',
-                'role': 'admin',
-                'created_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            }])
-            new_admin.to_csv(USERS_FILE, mode='a', header=not os.path.exists(USERS_FILE), index=False)
+        if not any(role == 'admin' for _, role in user_index().values()):
+            append_row(USERS_FILE, [
+                next_id(USERS_COUNTER, USERS_FILE, 'user_id'),
+                'admin', 'admin123', 'admin', datetime.now()
+            ])
+            load_users.clear()
+            user_index.clear()
     
     except Exception as e:
         st.error(f"System initialization failed: {str(e)}")
@@ -69,19 +245,29 @@ def initialize_system():
 # =============================================
 # AUTHENTICATION SYSTEM
 # =============================================
+@st.cache_data(ttl=300)
+def user_index():
+    """Map lowercased usernames to their (password, role) for O(1) lookup"""
+    users = pq.ParquetFile(USERS_FILE, memory_map=True).read(
+        columns=['username', 'password', 'role']
+    )
+    return {
+        u.strip().lower(): (str(p).strip(), str(r).strip().lower())
+        for u, p, r in zip(users['username'].to_pylist(),
+                           users['password'].to_pylist(),
+                           users['role'].to_pylist())
+        if u is not None
+    }
+
 def authenticate(username, password, role):
     """Secure authentication with validation"""
+    if not username or not password:
+        return False
     try:
-        users = pd.read_csv(USERS_FILE)
-        if users.empty:
-            return False
-            
-        user = users[
-            (users['username'].str.strip().str.lower() == username.strip().lower()) &
-            (users['password'].astype(str).str.strip() == password.strip()) &
-            (users['role'].str.strip().str.lower() == role.strip().lower())
-        ]
-        return not user.empty
+        record = user_index().get(username.strip().lower())
+        return (record is not None and
+                record[0] == password.strip() and
+                record[1] == role.strip().lower())
     except Exception as e:
         st.error(f"Authentication error: {str(e)}")
         return False
@@ -89,6 +275,10 @@ def authenticate(username, password, role):
 # =============================================
 # MAIN APPLICATION
 # =============================================
+_LOGIN_TITLE = "<h1 style='text-align: center; color: #1e3d6b;'>🎓 TeachIn</h1>"
+_ROLE_LC = {"Student": "student", "Teacher": "teacher", "Admin": "admin"}
+_ROLE_TITLE = {lc: title for title, lc in _ROLE_LC.items()}
+
 def main():
     st.set_page_config(
         page_title="TeachIn",
@@ -113,10 +303,10 @@ def main():
 def show_login():
     """Login interface with validation"""
     with st.container():
-        st.markdown("<h1 style='text-align: center; color: #1e3d6b;'>🎓 TeachIn</h1>", unsafe_allow_html=True)
+        st.markdown(_LOGIN_TITLE, unsafe_allow_html=True)
         
         with st.form("Login Form"):
-            role = st.selectbox("Select Role", ["Student", "Teacher", "Admin"])
+            role = st.selectbox("Select Role", list(_ROLE_LC))
             username = st.text_input("Username")
             password = st.text_input("Password", type="password")
             
@@ -124,7 +314,7 @@ def show_login():
                 if authenticate(username, password, role):
                     st.session_state.auth = {
                         'logged_in': True,
-                        'role': role.lower(),
+                        'role': _ROLE_LC[role],
                         'username': username
                     }
                     st.rerun()
@@ -137,7 +327,7 @@ def show_dashboard():
     role = st.session_state.auth['role']
     username = st.session_state.auth['username']
     
-    st.sidebar.header(f"Welcome, {username} ({role.title()})")
+    st.sidebar.header(f"Welcome, {username} ({_ROLE_TITLE[role]})")
     
     # Role-based routing
     if role == 'student':
@@ -154,6 +344,33 @@ def show_dashboard():
 # =============================================
 # DASHBOARD COMPONENTS (Partial Implementation)
 # =============================================
+_CARD_STAT = ("<div style='flex: 1;'>"
+              "<div style='font-size: 0.875rem; color: #6b7280;'>{label}</div>"
+              "<div style='font-size: 1.5rem;'>{value}</div></div>")
+
+def course_card(title, caption, description, link, link_label, stats,
+                divider=True):
+    """Render a course's details and stats as one Markdown element"""
+    def text(value):
+        if value is None or value != value:  # None or NaN
+            return ""
+        return html.escape(str(value)).replace("\n", "<br>")
+
+    link_html = ""
+    if link is not None:
+        link_html = f"<p><a href='{text(link)}' target='_blank'>{link_label}</a></p>"
+    stats_html = "".join(_CARD_STAT.format(label=label, value=text(value))
+                         for label, value in stats)
+    st.markdown(
+        f"<h3>{text(title)}</h3>"
+        f"<p style='color: #6b7280;'>{text(caption)}</p>"
+        f"<p>{text(description)}</p>"
+        f"{link_html}"
+        f"<div style='display: flex; gap: 1rem;'>{stats_html}</div>"
+        f"{'<hr>' if divider else ''}",
+        unsafe_allow_html=True
+    )
+
 def student_dashboard():
     menu = ["My Courses", "Assignments", "Grades", "Attendance"]
     choice = st.sidebar.selectbox("Menu", menu)
@@ -161,42 +378,42 @@ def student_dashboard():
     st.header(f"Student Dashboard - {choice}")
     
     if choice == "My Courses":
-        courses = pd.read_csv(COURSES_FILE)
-        # Filter only open courses
-        available_courses = courses[courses['enrollment_status'] == 'Open']
+        # Only open courses are read from disk
+        available_courses = load_courses(
+            columns=[
+                'course_id', 'course_name', 'description', 'instructor',
+                'schedule', 'created_at', 'enrollment_status',
+                'image_path', 'youtube_link'
+            ],
+            filters=[('enrollment_status', '=', 'Open')]
+        )
         
         if available_courses.empty:
             st.info("No available courses found")
             return
+
+        available_courses['created_fmt'] = available_courses['created_at'].dt.strftime("%b %d, %Y")
+
+        images = existing_images()
+        yt_links = available_courses['youtube_link']
+        yt_mask = (yt_links.notna() & yt_links.ne('')).to_numpy()
+        for i, row in enumerate(available_courses.itertuples(index=False)):
+            st.image(row.image_path if row.image_path in images else "placeholder.jpg",
+                     width=240)
+            course_card(
+                row.course_name, f"by {row.instructor}", row.description,
+                row.youtube_link if yt_mask[i] else None, "📺 Watch on YouTube",
+                [("Schedule", row.schedule),
+                 ("Status", row.enrollment_status),
+                 ("Created", row.created_fmt)],
+                divider=False
+            )
             
-        for _, row in available_courses.iterrows():
-            with st.container():
-                col1, col2 = st.columns([1, 3])
-                
-                with col1:
-                    if row['image_path'] and os.path.exists(row['image_path']):
-                        st.image(row['image_path'], use_column_width=True)
-                    else:
-                        st.image("placeholder.jpg", use_column_width=True)
-                
-                with col2:
-                    st.subheader(row['course_name'])
-                    st.caption(f"by {row['instructor']}")
-                    st.write(row['description'])
-                    
-                    if pd.notna(row['youtube_link']):
-                        st.markdown(f"[📺 Watch on YouTube]({row['youtube_link']})")
-                    
-                    cols = st.columns(3)
-                    cols[0].metric("Schedule", row['schedule'])
-                    cols[1].metric("Status", row['enrollment_status'])
-                    cols[2].metric("Created", pd.to_datetime(row['created_at']).strftime("%b %d, %Y"))
-                    
-                    # Add enrollment button
-                    if st.button("Enroll", key=f"enroll_{row['course_id']}"):
-                        st.success(f"Enrolled in {row['course_name']}!")
-                
-                st.markdown("---")
+            # Add enrollment button
+            if st.button("Enroll", key=f"enroll_{row.course_id}"):
+                st.success(f"Enrolled in {row.course_name}!")
+            
+            st.markdown("---")
 
     elif choice == "Attendance":
         st.subheader("Attendance")
@@ -219,38 +436,34 @@ def teacher_dashboard():
     st.header(f"Teacher Dashboard - {choice}")
     
     if choice == "My Courses":
-        courses = pd.read_csv(COURSES_FILE)
-        # Filter courses by current instructor
-        teacher_courses = courses[courses['instructor'] == st.session_state.auth['username']]
+        # Only the current instructor's courses are read from disk
+        teacher_courses = load_courses(
+            columns=[
+                'course_name', 'description', 'schedule', 'created_at',
+                'enrollment_status', 'image_path', 'youtube_link'
+            ],
+            filters=[('instructor', '=', st.session_state.auth['username'])]
+        )
         
         if teacher_courses.empty:
             st.info("You haven't created any courses yet")
             return
-            
-        for _, row in teacher_courses.iterrows():
-            with st.container():
-                col1, col2 = st.columns([1, 3])
-                
-                with col1:
-                    if row['image_path'] and os.path.exists(row['image_path']):
-                        st.image(row['image_path'], use_column_width=True)
-                    else:
-                        st.image("placeholder.jpg", use_column_width=True)
-                
-                with col2:
-                    st.subheader(row['course_name'])
-                    st.caption(f"Status: {row['enrollment_status']}")
-                    st.write(row['description'])
-                    
-                    if pd.notna(row['youtube_link']):
-                        st.markdown(f"[📺 YouTube Playlist]({row['youtube_link']})")
-                    
-                    cols = st.columns(3)
-                    cols[0].metric("Schedule", row['schedule'])
-                    cols[1].metric("Students Enrolled", "25")  # Placeholder
-                    cols[2].metric("Created", pd.to_datetime(row['created_at']).strftime("%b %d, %Y"))
-                
-                st.markdown("---")
+
+        teacher_courses['created_fmt'] = teacher_courses['created_at'].dt.strftime("%b %d, %Y")
+
+        images = existing_images()
+        yt_links = teacher_courses['youtube_link']
+        yt_mask = (yt_links.notna() & yt_links.ne('')).to_numpy()
+        for i, row in enumerate(teacher_courses.itertuples(index=False)):
+            st.image(row.image_path if row.image_path in images else "placeholder.jpg",
+                     width=240)
+            course_card(
+                row.course_name, f"Status: {row.enrollment_status}", row.description,
+                row.youtube_link if yt_mask[i] else None, "📺 YouTube Playlist",
+                [("Schedule", row.schedule),
+                 ("Students Enrolled", "25"),  # Placeholder
+                 ("Created", row.created_fmt)]
+            )
 
     elif choice == "Attendance":
         st.subheader("Attendance")
@@ -291,37 +504,30 @@ def teacher_dashboard():
 def save_course(name, desc, schedule, status, image, yt_link):
     """Save course with media handling"""
     try:
-        courses = pd.read_csv(COURSES_FILE)
-        
-        # Convert course_id to integers if not empty
-        if not courses.empty:
-            courses['course_id'] = courses['course_id'].astype(int)
-            new_id = courses['course_id'].max() + 1
-        else:
-            new_id = 1
+        new_id = next_id(COURSES_COUNTER, COURSES_FILE, 'course_id')
         
         # Handle image upload
-        img_path = ""
+        img_path = None
         if image:
-            os.makedirs("uploads/course_images", exist_ok=True)
-            img_path = f"uploads/course_images/{new_id}_{image.name}"
+            img_path = f"{IMAGES_DIR}/{new_id}_{image.name}"
+            image.seek(0)
             with open(img_path, "wb") as f:
-                f.write(image.getbuffer())
-        
-        # Create course entry
-        new_course = pd.DataFrame([{
-            'course_id': new_id,
-            'course_name': name,
-            'description': desc,
-            'instructor': st.session_state.auth['username'],
-            'schedule': schedule,
-            'enrollment_status': status,
-            'youtube_link': yt_link,
-            'image_path': img_path,
-            'created_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        }])
+                shutil.copyfileobj(image, f, length=64 * 1024)
+            existing_images.clear()
         
-        new_course.to_csv(COURSES_FILE, mode='a', header=False, index=False)
+        # Create course entry (fields in REQUIRED_STRUCTURE order)
+        append_row(COURSES_FILE, [
+            new_id,
+            name,
+            desc,
+            st.session_state.auth['username'],
+            schedule,
+            datetime.now(),
+            status,
+            img_path,
+            yt_link.strip() or None
+        ])
+        load_courses.clear()
         st.success("Course published successfully!")
         st.balloons()
         
@@ -338,8 +544,8 @@ def admin_dashboard():
         st.subheader("User Management")
         
         # Show existing users
-        users = pd.read_csv(USERS_FILE)
-        st.dataframe(users[['username', 'role', 'created_at']])
+        users = load_users(columns=['username', 'role', 'created_at'])
+        st.dataframe(users)
         
         # Add new user form
         with st.expander("Add New User", expanded=True):
@@ -358,20 +564,19 @@ def admin_dashboard():
                         st.error("Please fill all required fields (*)")
                     elif new_password != confirm_password:
                         st.error("Passwords do not match!")
-                    elif new_username.lower() in users['username'].str.lower().values:
+                    elif new_username.strip().lower() in user_index():
                         st.error("Username already exists!")
                     else:
                         # Create new user
-                        new_user = pd.DataFrame([{
-                            'user_id': users['user_id'].max() + 1 if not users.empty else 1,
-                            'username': new_username.strip(),
-                            'password': new_password,
-                            'role': new_role.lower(),
-                            'created_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                        }])
-                        
-                        # Save to CSV
-                        new_user.to_csv(USERS_FILE, mode='a', header=False, index=False)
+                        append_row(USERS_FILE, [
+                            next_id(USERS_COUNTER, USERS_FILE, 'user_id'),
+                            new_username.strip(),
+                            new_password,
+                            new_role.lower(),
+                            datetime.now()
+                        ])
+                        load_users.clear()
+                        user_index.clear()
                         st.success(f"User {new_username} created successfully!")
                         st.rerun()
 